@@ -0,0 +1,447 @@
+# bench.py
+# Tap Royale — нагрузочный тест и бенчмарк всех роутов API
+#
+# Примеры:
+#   python bench.py --seed --users 20000 --guilds 500
+#   python bench.py --duration 30 --concurrency 16 --out before.json
+#   python bench.py --url http://127.0.0.1:8000 --duration 30 --out after.json --compare before.json
+#     (сервер под --url — с RATE_LIMIT=0: бенч шлёт всё с одного адреса)
+#   python bench.py --storage memory --duration 30   # хендлеры без Postgres
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+# ================== TRAFFIC MIX ==================
+
+# доли операций в смешанной нагрузке (синк — основная)
+DEFAULT_MIX = {
+    "sync": 70,
+    "sync_batch": 1,
+    "leaderboard": 8,
+    "rank": 4,
+    "guilds": 4,
+    "guild_my": 6,
+    "join_leave": 3,
+    "donate": 5,
+}
+
+LEADERBOARD_TYPES = ("level", "gold", "refs")
+MEMBERS_PER_GUILD = 10
+SYNC_BATCH_SIZE = 50
+
+# ================== SEED ==================
+
+def seed(dsn, users, guilds):
+    """Заливает users/guilds/guild_members тестовыми игроками bench-<i>.
+
+    Первые guilds * MEMBERS_PER_GUILD игроков распределены по гильдиям,
+    остальные без гильдии (их используют join/leave). Повторный запуск
+    ничего не дублирует.
+    """
+    import psycopg2
+
+    members = min(users, guilds * MEMBERS_PER_GUILD)
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO users (tg_id, nickname, gold, gems, level, total_taps)
+        SELECT 'bench-' || i, 'Bench ' || i,
+            (random() * 100000)::bigint, 10, 1 + (random() * 50)::int, (random() * 1000000)::bigint
+        FROM generate_series(0, %s - 1) i
+        ON CONFLICT (tg_id) DO NOTHING
+        """,
+        (users,),
+    )
+    cur.execute(
+        """
+        INSERT INTO guilds (name, leader_id, member_count)
+        SELECT 'bench-guild-' || i, 'bench-' || i, 0
+        FROM generate_series(0, %s - 1) i
+        ON CONFLICT (name) DO NOTHING
+        """,
+        (guilds,),
+    )
+    cur.execute(
+        """
+        INSERT INTO guild_members (guild_id, tg_id, role)
+        SELECT g.id, 'bench-' || j, CASE WHEN j < %s THEN 'leader' ELSE 'member' END
+        FROM generate_series(0, %s - 1) j
+        JOIN guilds g ON g.name = 'bench-guild-' || (j %% %s)
+        ON CONFLICT (guild_id, tg_id) DO NOTHING
+        """,
+        (guilds, members, guilds),
+    )
+    cur.execute(
+        """
+        UPDATE users u SET guild_id = gm.guild_id
+        FROM guild_members gm
+        WHERE gm.tg_id = u.tg_id AND u.tg_id LIKE 'bench-%%'
+        """
+    )
+    cur.execute(
+        """
+        UPDATE guilds g
+        SET member_count = t.members, total_level = t.levels
+        FROM (
+            SELECT gm.guild_id, COUNT(*) AS members, SUM(u.level) AS levels
+            FROM guild_members gm
+            JOIN users u ON u.tg_id = gm.tg_id
+            GROUP BY gm.guild_id
+        ) t
+        WHERE g.id = t.guild_id AND g.name LIKE 'bench-guild-%%'
+        """
+    )
+    cur.execute("SELECT id FROM guilds WHERE name LIKE 'bench-guild-%%' ORDER BY id")
+    guild_ids = [r[0] for r in cur.fetchall()]
+    conn.commit()
+    cur.close()
+    conn.close()
+    return guild_ids
+
+
+def seed_store(store, users, guilds):
+    """То же, что seed(), через интерфейс хранилища server.py (для --storage memory)."""
+    rng = random.Random(0)
+    store.upsert_users([
+        ("bench-%d" % i, "Bench %d" % i, rng.randrange(100000), 10, 1 + rng.randrange(51), rng.randrange(1000000))
+        for i in range(users)
+    ])
+    members = min(users, guilds * MEMBERS_PER_GUILD)
+    guild_ids = [
+        store.create_guild("bench-%d" % i, "bench-guild-%d" % i)["guild_id"]
+        for i in range(min(guilds, users))
+    ]
+    for j in range(len(guild_ids), members):
+        store.join_guild("bench-%d" % j, guild_ids[j % len(guild_ids)])
+    return guild_ids
+
+
+def load_guild_ids(dsn):
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM guilds WHERE name LIKE 'bench-guild-%%' ORDER BY id")
+    guild_ids = [r[0] for r in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return guild_ids
+
+# ================== CLIENTS ==================
+
+class InProcessClient:
+    """Flask test client: меряем хендлеры без сети и gunicorn."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, params=None, body=None):
+        resp = self.client.open(path, method=method, query_string=params, json=body)
+        resp.close()
+        return resp.status_code
+
+
+class HttpClient:
+    """Keep-alive HTTP к запущенному gunicorn (одно соединение на поток)."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.conn = None
+
+    def request(self, method, path, params=None, body=None):
+        if params:
+            path = path + "?" + urlencode(params)
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, payload, headers)
+                resp = self.conn.getresponse()
+                resp.read()
+                return resp.status
+            except (http.client.HTTPException, OSError):
+                # сервер закрыл keep-alive — переподключаемся один раз
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+# ================== WORKLOAD ==================
+
+class Workload:
+    """Генератор реалистичных запросов по засеянным bench-игрокам."""
+
+    def __init__(self, users, guild_ids, mix, rng):
+        self.users = users
+        self.guild_ids = guild_ids
+        self.members = min(users, len(guild_ids) * MEMBERS_PER_GUILD)
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.rng = rng
+
+    def player(self):
+        return "bench-%d" % self.rng.randrange(self.users)
+
+    def member(self):
+        return "bench-%d" % self.rng.randrange(max(self.members, 1))
+
+    def loner(self):
+        # игроки без гильдии — за пределами засеянных членов
+        if self.members >= self.users:
+            return None
+        return "bench-%d" % self.rng.randrange(self.members, self.users)
+
+    def progress(self):
+        rng = self.rng
+        return {
+            "tg_id": self.player(),
+            "gold": rng.randrange(200000),
+            "gems": rng.randrange(20),
+            "level": rng.randrange(1, 60),
+            "totalTaps": rng.randrange(2000000),
+        }
+
+    def next(self):
+        """Список (роут, метод, путь, query, тело) для одной операции."""
+        rng = self.rng
+        op = rng.choices(self.ops, self.weights)[0]
+        if op == "sync":
+            return [("sync", "POST", "/api/sync", None, self.progress())]
+        if op == "sync_batch":
+            return [("sync_batch", "POST", "/api/sync/batch", None, [
+                self.progress() for _ in range(SYNC_BATCH_SIZE)
+            ])]
+        if op == "leaderboard":
+            return [("leaderboard", "GET", "/api/leaderboard", {"type": rng.choice(LEADERBOARD_TYPES)}, None)]
+        if op == "rank":
+            return [("rank", "GET", "/api/leaderboard/rank", {
+                "tg_id": self.player(), "type": rng.choice(LEADERBOARD_TYPES),
+            }, None)]
+        if op == "guilds":
+            return [("guilds", "GET", "/api/guilds", None, None)]
+        if op == "guild_my":
+            return [("guild_my", "GET", "/api/guild/my", {"tg_id": self.member()}, None)]
+        if op == "donate":
+            return [("donate", "POST", "/api/guild/donate", None, {
+                "tg_id": self.member(), "amount": rng.randrange(1, 50),
+            })]
+        if op == "join_leave":
+            tg_id = self.loner()
+            if tg_id is None or not self.guild_ids:
+                return []
+            return [
+                ("join", "POST", "/api/guild/join", None, {
+                    "tg_id": tg_id, "guild_id": rng.choice(self.guild_ids),
+                }),
+                ("leave", "POST", "/api/guild/leave", None, {"tg_id": tg_id}),
+            ]
+        raise ValueError("unknown op %r" % op)
+
+# ================== RUNNER ==================
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    i = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[i]
+
+
+def run(make_client, users, guild_ids, mix, duration, concurrency, seed_value):
+    """Гоняет нагрузку concurrency потоками duration секунд."""
+    latencies = {}
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(n):
+        client = make_client()
+        workload = Workload(users, guild_ids, mix, random.Random(seed_value * 1000 + n))
+        local_lat = {}
+        local_status = {}
+        while time.monotonic() < deadline:
+            for route, method, path, params, body in workload.next():
+                started = time.perf_counter()
+                try:
+                    status = client.request(method, path, params, body)
+                except Exception:
+                    status = 0
+                local_lat.setdefault(route, []).append(time.perf_counter() - started)
+                bucket = local_status.setdefault(route, {})
+                bucket[status] = bucket.get(status, 0) + 1
+        with lock:
+            for route, values in local_lat.items():
+                latencies.setdefault(route, []).extend(values)
+            for route, counts in local_status.items():
+                bucket = statuses.setdefault(route, {})
+                for status, count in counts.items():
+                    bucket[status] = bucket.get(status, 0) + count
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    return summarize(latencies, statuses, elapsed)
+
+
+def summarize(latencies, statuses, elapsed):
+    routes = {}
+    all_values = []
+    for route, values in sorted(latencies.items()):
+        values.sort()
+        all_values.extend(values)
+        counts = statuses.get(route, {})
+        routes[route] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3),
+            "errors": sum(c for s, c in counts.items() if s == 0 or s >= 500),
+            "rejected": sum(c for s, c in counts.items() if 400 <= s < 500),
+            "statuses": {str(s): c for s, c in sorted(counts.items())},
+        }
+    all_values.sort()
+    total = {
+        "requests": len(all_values),
+        "rps": round(len(all_values) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(all_values, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(all_values, 0.99) * 1000, 3),
+        "errors": sum(r["errors"] for r in routes.values()),
+    }
+    return {"elapsed": round(elapsed, 3), "routes": routes, "total": total}
+
+# ================== REPORT ==================
+
+def print_report(result, baseline=None):
+    header = "%-12s %9s %9s %10s %10s %7s %8s" % ("route", "requests", "rps", "p50 ms", "p99 ms", "errors", "rejected")
+    print(header)
+    print("-" * len(header))
+    rows = list(result["routes"].items()) + [("TOTAL", dict(result["total"], rejected=""))]
+    for route, r in rows:
+        print("%-12s %9d %9.1f %10.3f %10.3f %7d %8s" % (
+            route, r["requests"], r["rps"], r["p50_ms"], r["p99_ms"], r["errors"], r["rejected"],
+        ))
+        if baseline is not None:
+            base = baseline["total"] if route == "TOTAL" else baseline["routes"].get(route)
+            if base:
+                print("%-12s %9s %+8.1f%% %+9.1f%% %+9.1f%%" % (
+                    "  vs base", "",
+                    _delta(r["rps"], base["rps"]),
+                    _delta(r["p50_ms"], base["p50_ms"]),
+                    _delta(r["p99_ms"], base["p99_ms"]),
+                ))
+
+
+def _delta(new, old):
+    return (new - old) / old * 100 if old else 0.0
+
+# ================== CLI ==================
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for part in text.split(","):
+            op, _, weight = part.partition("=")
+            if op not in DEFAULT_MIX:
+                raise SystemExit("unknown op in --mix: %s" % op)
+            mix[op] = float(weight)
+    return {op: w for op, w in mix.items() if w > 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tap Royale API benchmark")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="Postgres для сида (по умолчанию DATABASE_URL)")
+    parser.add_argument("--url", help="gunicorn/HTTP сервер; без него — Flask app в этом процессе")
+    parser.add_argument("--storage", choices=("postgres", "memory"), default="postgres",
+                        help="хранилище in-process прогона; memory — без базы, сид каждый раз")
+    parser.add_argument("--seed", action="store_true", help="засеять bench-игроков и гильдии перед прогоном")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20, help="секунд нагрузки (0 — только сид)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", help="веса операций, например sync=50,donate=20")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--out", help="сохранить результат в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    if args.storage == "memory":
+        if args.url:
+            raise SystemExit("--storage memory works only in-process (without --url)")
+        os.environ["STORAGE"] = "memory"
+    elif not args.dsn:
+        raise SystemExit("--dsn or DATABASE_URL required")
+    else:
+        os.environ.setdefault("DATABASE_URL", args.dsn)
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)  # noqa: E731
+    else:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        # все запросы бенча идут с одного адреса от небольшого числа игроков
+        os.environ.setdefault("RATE_LIMIT", "0")
+        import server
+
+        server.storage.init()
+        make_client = lambda: InProcessClient(server.app)  # noqa: E731
+
+    if args.storage == "memory":
+        started = time.monotonic()
+        guild_ids = seed_store(server.storage, args.users, args.guilds)
+        print("seeded %d users / %d guilds in memory in %.1fs" % (args.users, len(guild_ids), time.monotonic() - started))
+    elif args.seed:
+        started = time.monotonic()
+        guild_ids = seed(args.dsn, args.users, args.guilds)
+        print("seeded %d users / %d guilds in %.1fs" % (args.users, len(guild_ids), time.monotonic() - started))
+    else:
+        guild_ids = load_guild_ids(args.dsn)
+
+    if args.duration <= 0:
+        return
+
+    mix = parse_mix(args.mix)
+    result = run(make_client, args.users, guild_ids, mix, args.duration, args.concurrency, args.random_seed)
+    result["config"] = {
+        "target": args.url or "in-process",
+        "storage": args.storage,
+        "users": args.users,
+        "guilds": len(guild_ids),
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "random_seed": args.random_seed,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print("saved %s" % args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# server_async.py
+# Tap Royale — асинхронный режим: те же роуты и ответы, что в server.py,
+# но на событийном цикле gevent вместо потока на запрос.
+#
+# Запуск:
+#   gunicorn -k gevent --worker-connections 2000 -w 2 server_async:app
+#   python server_async.py
+#
+# psycopg2 переводится в «зелёный» режим (wait callback): пока запрос ждёт
+# Postgres, воркер обслуживает остальные. Пул, блокировки и фоновые потоки
+# server.py после monkey-патча становятся кооперативными, поэтому хендлеры
+# не дублируются и JSON-контракты совпадают один в один.
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import os
+
+import psycopg2
+import psycopg2.extensions
+from gevent.socket import wait_read, wait_write
+
+# ================== CONFIG ==================
+
+# тысячи запросов в полёте делят пул воркера — по умолчанию он шире, чем у sync
+os.environ.setdefault("DB_POOL_MAX", "50")
+os.environ.setdefault("DB_POOL_TIMEOUT", "10")
+
+# ================== GREEN PSYCOPG2 ==================
+
+def gevent_wait_callback(conn, timeout=None):
+    """Ждёт сокет соединения через хаб gevent вместо блокирующего read."""
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            break
+        elif state == psycopg2.extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError("Bad result from poll: %r" % state)
+
+
+psycopg2.extensions.set_wait_callback(gevent_wait_callback)
+
+from server import app, storage  # noqa: E402
+
+# ================== START ==================
+
+if __name__ == "__main__":
+    from gevent.pywsgi import WSGIServer
+
+    storage.init()
+    port = int(os.environ.get("PORT", 5000))
+    WSGIServer(("0.0.0.0", port), app).serve_forever()
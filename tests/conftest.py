@@ -0,0 +1,57 @@
+import os
+
+# до импорта server: хранилище в памяти, без лимитов и фоновых потоков
+os.environ["STORAGE"] = "memory"
+os.environ["RATE_LIMIT"] = "0"
+os.environ["SYNC_WRITE_BEHIND"] = "0"
+os.environ["RANK_INDEX"] = "0"
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Клиент Flask над чистым MemoryStore и пустыми кэшами."""
+    monkeypatch.setattr(server, "storage", server.MemoryStore())
+    monkeypatch.setattr(
+        server, "leaderboards", server.LeaderboardCache(server.LEADERBOARD_CACHE_SIZE, server.LEADERBOARD_TTL)
+    )
+    monkeypatch.setattr(
+        server, "membership", server.MembershipCache(server.MEMBERSHIP_CACHE_SIZE, server.MEMBERSHIP_CACHE_TTL)
+    )
+    monkeypatch.setattr(server, "idempotency_cache", server.IdempotencyCache(server.IDEMPOTENCY_CACHE_SIZE))
+    return server.app.test_client()
+
+
+@pytest.fixture
+def api(client):
+    class Api:
+        def post(self, path, headers=None, **body):
+            r = client.post(path, json=body, headers=headers)
+            return r.status_code, r.get_json()
+
+        def get(self, path, headers=None, **args):
+            return client.get(path, query_string=args, headers=headers)
+
+        def player(self, tg_id, gold=0, gems=0, level=1):
+            assert self.post("/api/sync", tg_id=tg_id, gold=gold, gems=gems, level=level)[0] == 200
+
+        def guild(self, leader, name, *members):
+            self.player(leader, gems=5)
+            status, body = self.post("/api/guild/create", tg_id=leader, name=name)
+            assert status == 200, body
+            for tg_id in members:
+                if server.storage.get_user(tg_id) is None:
+                    self.player(tg_id)
+                assert self.post("/api/guild/join", tg_id=tg_id, guild_id=body["guild_id"]) == (200, {"success": True})
+            return body["guild_id"]
+
+        def my_guild(self, tg_id):
+            return self.get("/api/guild/my", tg_id=tg_id).get_json()["guild"]
+
+        def gold(self, tg_id):
+            return server.storage.get_user(tg_id)["gold"]
+
+    return Api()
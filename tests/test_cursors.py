@@ -0,0 +1,78 @@
+import server
+
+
+def pages(api, path, **args):
+    """Все страницы по X-Next-Cursor подряд."""
+    items, cursor = [], None
+    while True:
+        query = dict(args, cursor=cursor) if cursor else args
+        r = api.get(path, **query)
+        assert r.status_code == 200, r.get_json()
+        items.extend(r.get_json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+def test_leaderboard_pages_past_cache(api):
+    # больше, чем LEADERBOARD_CACHE_SIZE, и с повторами золота — хвост идёт keyset'ом
+    count = server.LEADERBOARD_CACHE_SIZE + 57
+    for i in range(count):
+        api.player("p%d" % i, gold=i % 40, level=1 + i % 3)
+
+    users = [server.storage.get_user("p%d" % i) for i in range(count)]
+    for lb_type, columns in server.LEADERBOARD_TYPES.items():
+        expected = sorted(users, key=lambda u: [-u[c] for c in columns])
+        got = pages(api, "/api/leaderboard", type=lb_type, limit=server.PAGE_SIZE_MAX)
+        assert [r["tg_id"] for r in got] == [u["tg_id"] for u in expected]
+
+
+def test_leaderboard_cursor_survives_updates(api):
+    for i in range(10):
+        api.player("p%d" % i, gold=100 - i)
+
+    first = api.get("/api/leaderboard", type="gold", limit=4)
+    cursor = first.headers["X-Next-Cursor"]
+    # игрок со страницы 1 обгоняет всех — на следующей странице его нет, пропусков нет
+    api.player("p9", gold=1000)
+
+    rest = pages(api, "/api/leaderboard", type="gold", limit=4, cursor=cursor)
+    assert [r["tg_id"] for r in rest] == ["p4", "p5", "p6", "p7", "p8"]
+
+
+def test_guild_pages(api):
+    for i in range(7):
+        api.player("m%d" % i, level=i + 1)
+        api.guild("l%d" % i, "Guild %d" % i, "m%d" % i)
+
+    got = pages(api, "/api/guilds", limit=3)
+    assert [g["name"] for g in got] == ["Guild %d" % i for i in reversed(range(7))]
+
+
+def test_ledger_pages(api):
+    api.guild("leader", "Royals", "m1")
+    api.player("m1", gold=1000)
+    for amount in range(1, 12):
+        api.post("/api/guild/donate", tg_id="m1", amount=amount)
+
+    got = pages(api, "/api/guild/ledger", tg_id="m1", limit=4)
+    assert [e["amount"] for e in got] == list(range(11, 0, -1))
+
+
+def test_invalid_cursor(api):
+    api.player("p1")
+    for path in ("/api/leaderboard", "/api/guilds", "/api/guild/ledger"):
+        for cursor in ("!!", server.encode_cursor(["x", 1]), server.encode_cursor([1, 2, 3, 4])):
+            r = api.get(path, tg_id="p1", cursor=cursor)
+            assert (r.status_code, r.get_json()) == (400, {"error": "Invalid cursor"}), (path, cursor)
+
+
+def test_rank_without_index(api):
+    for i in range(10):
+        api.player("p%d" % i, gold=i * 10)
+
+    body = api.get("/api/leaderboard/rank", tg_id="p3", type="gold", around=2).get_json()
+    assert (body["rank"], body["total"]) == (7, 10)
+    assert [(e["rank"], e["tg_id"]) for e in body["around"]] == [
+        (5, "p5"), (6, "p4"), (7, "p3"), (8, "p2"), (9, "p1"),
+    ]
@@ -0,0 +1,99 @@
+def test_join_updates_guild(api):
+    api.player("m1", level=7)
+    gid = api.guild("leader", "Royals", "m1")
+
+    guild = api.my_guild("m1")
+    assert guild["id"] == gid
+    assert guild["member_count"] == 2
+    assert guild["total_level"] == 8
+    assert guild["my_role"] == "member"
+    assert api.my_guild("leader")["my_role"] == "leader"
+
+
+def test_join_rejections(api):
+    gid = api.guild("leader", "Royals")
+    other = api.guild("other", "Knights")
+    api.player("m1")
+
+    assert api.post("/api/guild/join", tg_id="ghost", guild_id=gid) == (404, {"error": "User not found"})
+    assert api.post("/api/guild/join", tg_id="m1", guild_id=999) == (404, {"error": "Guild not found"})
+    assert api.post("/api/guild/join", tg_id="other", guild_id=gid) == (400, {"error": "Already in guild"})
+    assert api.post("/api/guild/join", tg_id="m1", guild_id=other) == (200, {"success": True})
+    assert api.post("/api/guild/join", tg_id="m1", guild_id=gid) == (400, {"error": "Already in guild"})
+
+
+def test_guild_full(api):
+    members = ["m%d" % i for i in range(19)]
+    for tg_id in members + ["late"]:
+        api.player(tg_id)
+    gid = api.guild("leader", "Royals", *members)
+
+    assert api.my_guild("leader")["member_count"] == 20
+    assert api.post("/api/guild/join", tg_id="late", guild_id=gid) == (400, {"error": "Guild full"})
+
+
+def test_leave_member(api):
+    api.player("m1", level=4)
+    api.guild("leader", "Royals", "m1")
+
+    assert api.post("/api/guild/leave", tg_id="m1") == (200, {"success": True})
+    assert api.my_guild("m1") is None
+    guild = api.my_guild("leader")
+    assert (guild["member_count"], guild["total_level"]) == (1, 1)
+    assert api.post("/api/guild/leave", tg_id="m1") == (400, {"error": "Not in guild"})
+
+
+def test_leader_leave_hands_over_to_oldest_member(api):
+    for tg_id in ("m1", "m2"):
+        api.player(tg_id)
+    api.guild("leader", "Royals", "m1", "m2")
+
+    assert api.post("/api/guild/leave", tg_id="leader") == (200, {"success": True})
+
+    guild = api.my_guild("m2")
+    assert guild["leader_id"] == "m1"
+    assert guild["member_count"] == 2
+    assert api.my_guild("m1")["my_role"] == "leader"
+
+
+def test_last_member_leave_deletes_guild(api):
+    gid = api.guild("leader", "Royals")
+
+    assert api.post("/api/guild/leave", tg_id="leader") == (200, {"success": True})
+
+    assert api.get("/api/guilds").get_json() == []
+    api.player("m1")
+    assert api.post("/api/guild/join", tg_id="m1", guild_id=gid) == (404, {"error": "Guild not found"})
+
+
+def test_kick(api):
+    for tg_id in ("m1", "m2", "stranger"):
+        api.player(tg_id)
+    api.guild("leader", "Royals", "m1", "m2")
+
+    assert api.post("/api/guild/kick", tg_id="m1", target_id="m2") == (403, {"error": "Not leader"})
+    assert api.post("/api/guild/kick", tg_id="leader", target_id="leader") == (400, {"error": "Cannot kick yourself"})
+    assert api.post("/api/guild/kick", tg_id="leader", target_id="stranger") == (
+        400,
+        {"error": "Target not in guild"},
+    )
+    assert api.post("/api/guild/kick", tg_id="stranger", target_id="m1") == (400, {"error": "Not in guild"})
+
+    assert api.post("/api/guild/kick", tg_id="leader", target_id="m1") == (200, {"success": True})
+    assert api.my_guild("m1") is None
+    assert sorted(m["tg_id"] for m in api.my_guild("leader")["members"]) == ["leader", "m2"]
+
+
+def test_my_guild_etag(api):
+    api.player("m1")
+    gid = api.guild("leader", "Royals")
+
+    first = api.get("/api/guild/my", tg_id="leader")
+    etag = first.headers["ETag"]
+    assert api.get("/api/guild/my", headers={"If-None-Match": etag}, tg_id="leader").status_code == 304
+
+    api.post("/api/guild/join", tg_id="m1", guild_id=gid)
+    changed = api.get("/api/guild/my", headers={"If-None-Match": etag}, tg_id="leader")
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["guild"]["member_count"] == 2
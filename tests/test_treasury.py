@@ -0,0 +1,98 @@
+import server
+
+
+def test_donate_moves_gold_to_treasury(api):
+    gid = api.guild("leader", "Royals", "m1")
+    api.player("m1", gold=100)
+
+    assert api.post("/api/guild/donate", tg_id="m1", amount=30) == (200, {"success": True})
+
+    guild = api.my_guild("m1")
+    assert guild["id"] == gid
+    assert guild["treasury"] == 30
+    assert {m["tg_id"]: m["donated"] for m in guild["members"]} == {"leader": 0, "m1": 30}
+    assert api.gold("m1") == 70
+
+
+def test_donate_rejections(api):
+    api.guild("leader", "Royals")
+    api.player("loner", gold=100)
+
+    assert api.post("/api/guild/donate", tg_id="loner", amount=10) == (400, {"error": "Not in guild"})
+    assert api.post("/api/guild/donate", tg_id="leader", amount=10) == (400, {"error": "Not enough gold"})
+    assert api.post("/api/guild/donate", tg_id="leader", amount=0) == (400, {"error": "Invalid amount"})
+    assert api.my_guild("leader")["treasury"] == 0
+
+
+def test_give_and_withdraw(api):
+    api.guild("leader", "Royals", "m1")
+    api.player("m1", gold=100)
+    api.post("/api/guild/donate", tg_id="m1", amount=100)
+
+    assert api.post("/api/guild/give", tg_id="leader", target_id="m1", amount=40) == (200, {"success": True})
+    assert api.post("/api/guild/withdraw", tg_id="leader", amount=50) == (200, {"success": True})
+
+    assert api.my_guild("leader")["treasury"] == 10
+    assert api.gold("m1") == 40
+    assert api.gold("leader") == 50
+
+
+def test_payout_rejections(api):
+    api.guild("leader", "Royals", "m1")
+    api.player("m1", gold=100)
+    api.player("stranger")
+    api.post("/api/guild/donate", tg_id="m1", amount=100)
+
+    assert api.post("/api/guild/give", tg_id="m1", target_id="leader", amount=10) == (403, {"error": "Not leader"})
+    assert api.post("/api/guild/withdraw", tg_id="m1", amount=10) == (403, {"error": "Not leader"})
+    assert api.post("/api/guild/give", tg_id="leader", target_id="stranger", amount=10) == (
+        400,
+        {"error": "Target not in guild"},
+    )
+    assert api.post("/api/guild/withdraw", tg_id="leader", amount=101) == (400, {"error": "Not enough in treasury"})
+    assert api.post("/api/guild/withdraw", tg_id="stranger", amount=1) == (400, {"error": "Not in guild"})
+    assert api.my_guild("leader")["treasury"] == 100
+
+
+def test_gold_is_conserved(api):
+    api.guild("leader", "Royals", "a", "b")
+    for tg_id in ("a", "b"):
+        api.player(tg_id, gold=500)
+
+    for i in range(20):
+        api.post("/api/guild/donate", tg_id="ab"[i % 2], amount=37)
+        api.post("/api/guild/give", tg_id="leader", target_id="ab"[(i + 1) % 2], amount=25)
+        api.post("/api/guild/withdraw", tg_id="leader", amount=9)
+
+    total = sum(api.gold(t) for t in ("leader", "a", "b")) + api.my_guild("leader")["treasury"]
+    assert total == 1000
+
+
+def test_idempotent_donate_charges_once(api):
+    api.guild("leader", "Royals", "m1")
+    api.player("m1", gold=100)
+    headers = {"Idempotency-Key": "donate-1"}
+
+    first = api.post("/api/guild/donate", headers=headers, tg_id="m1", amount=30)
+    again = api.post("/api/guild/donate", headers=headers, tg_id="m1", amount=30)
+
+    assert first == again == (200, {"success": True})
+    assert api.gold("m1") == 70
+    assert api.post("/api/guild/donate", headers=headers, tg_id="m1", amount=31)[0] == 422
+
+
+def test_ledger_newest_first(api):
+    api.guild("leader", "Royals", "m1")
+    api.player("m1", gold=100)
+    api.post("/api/guild/donate", tg_id="m1", amount=60)
+    api.post("/api/guild/give", tg_id="leader", target_id="m1", amount=20)
+    api.post("/api/guild/withdraw", tg_id="leader", amount=10)
+
+    entries = api.get("/api/guild/ledger", tg_id="m1").get_json()
+    assert [(e["kind"], e["amount"], e["target_id"]) for e in entries] == [
+        ("withdraw", -10, None),
+        ("give", -20, "m1"),
+        ("donate", 60, None),
+    ]
+    assert sum(e["amount"] for e in entries) == api.my_guild("m1")["treasury"]
+    assert server.storage.ledger("nobody", None, 10) == []